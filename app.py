@@ -1,11 +1,15 @@
+import io
 import sys
-import json
 import threading
 import logging
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
 
 from utils.config_loader import load_config
 from utils.rate_limiter import rate_limited_session
+from utils.semantic_cache import SemanticCache
 from utils.vector_store import VectorStore
 from mcp_clients.notion_client import NotionMCPClient
 from mcp_clients.github_client import GitHubMCPClient
@@ -22,38 +26,39 @@ def setup_logging() -> None:
 class JsonRpcIO:
 	def __init__(self) -> None:
 		self._write_lock = threading.Lock()
+		# Read raw bytes with a large buffer; orjson parses bytes directly, so no decode step
+		self._in = io.BufferedReader(sys.stdin.buffer.raw, buffer_size=65536)
+		self._out = sys.stdout.buffer
 
 	def read(self) -> Optional[Dict[str, Any]]:
-		line = sys.stdin.readline()
+		line = self._in.readline()
 		if not line:
 			return None
 		try:
-			return json.loads(line)
+			return orjson.loads(line)
 		except Exception:
 			logging.exception("Failed to parse incoming JSON")
 			return None
 
 	def write(self, obj: Dict[str, Any]) -> None:
+		payload = orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
 		with self._write_lock:
-			sys.stdout.write(json.dumps(obj) + "\n")
-			sys.stdout.flush()
+			self._out.write(payload)
+			self._out.flush()
+
+
+# Concurrent Notion/GitHub fetches during ingest; the shared session still enforces the rate limit
+INGEST_FETCH_WORKERS = 4
+# Chunks shorter than this (after stripping) carry no retrievable content and are not embedded
+MIN_CHUNK_CHARS = 32
 
 
 def _chunk_text(text: str, max_chars: int = 2000, overlap: int = 200) -> List[str]:
 	if not text:
 		return []
-	chunks: List[str] = []
-	start = 0
-	while start < len(text):
-		end = min(len(text), start + max_chars)
-		segment = text[start:end]
-		chunks.append(segment)
-		start = end - overlap
-		if start < 0:
-			start = 0
-		if end == len(text):
-			break
-	return chunks
+	step = max(1, max_chars - overlap)
+	# A window starting within `overlap` of the end would only repeat the previous chunk's tail
+	return [text[start:start + max_chars] for start in range(0, max(len(text) - overlap, 1), step)]
 
 
 class MCPServer:
@@ -61,7 +66,8 @@ class MCPServer:
 		self.io = JsonRpcIO()
 		self.logger = logging.getLogger("MCPServer")
 		self.session = rate_limited_session()
-		self.vector_store = VectorStore()
+		self.vector_store = VectorStore(persist_dir=config.get("VECTOR_STORE_DIR"))
+		self.answer_cache = SemanticCache()
 		self.notion = NotionMCPClient(config["NOTION_TOKEN"], self.session)
 		self.github = GitHubMCPClient(config["GITHUB_TOKEN"], self.session)
 		self.openai_api_key = config["OPENAI_API_KEY"]
@@ -112,42 +118,73 @@ class MCPServer:
 		github_owner = args.get("github_owner")
 		github_repo = args.get("github_repo")
 		github_paths: List[str] = args.get("github_paths", ["README.md"]) if isinstance(args.get("github_paths"), list) else ["README.md"]
+		if not (github_owner and github_repo):
+			github_paths = []
 
-		added = 0
-		# Ingest Notion pages
+		def fetch_github(path: str) -> Optional[str]:
+			try:
+				return self.github.fetch_file_content(github_owner, github_repo, path)
+			except Exception:
+				self.logger.warning("Failed to ingest GitHub path: %s", path, exc_info=True)
+				return None
+
+		pending: List[Tuple[str, Dict[str, Any]]] = []
 		npages = self.notion.list_pages(notion_limit)
-		for p in npages:
-			pid = p.get("id")
-			if not pid:
-				continue
-			page = self.notion.fetch_page(pid)
-			blocks = page.get("blocks", [])
-			full_text = "\n".join(_extract_notion_block_text(b) for b in blocks)
-			for chunk in _chunk_text(full_text):
-				self.vector_store.add([(chunk, {"source": "notion", "page_id": pid})], api_key=self.openai_api_key)
-				added += 1
-
-		# Ingest GitHub files if provided
-		if github_owner and github_repo:
-			for path in github_paths:
-				try:
-					content = self.github.fetch_file_content(github_owner, github_repo, path)
-					for chunk in _chunk_text(content):
-						self.vector_store.add([(chunk, {"source": "github", "owner": github_owner, "repo": github_repo, "path": path})], api_key=self.openai_api_key)
-						added += 1
-				except Exception:
-					self.logger.warning("Failed to ingest GitHub path: %s", path, exc_info=True)
-
-		return {"status": "ok", "chunks_indexed": added}
+		pids = [p["id"] for p in npages if p.get("id")]
+		with ThreadPoolExecutor(max_workers=INGEST_FETCH_WORKERS) as executor:
+			# Both maps are submitted up front so Notion and GitHub requests overlap
+			pages = executor.map(self.notion.fetch_page, pids)
+			contents = executor.map(fetch_github, github_paths)
+
+			# Ingest Notion pages
+			for pid, page in zip(pids, pages):
+				blocks = page.get("blocks", [])
+				full_text = "\n".join(_extract_notion_block_text(b) for b in blocks)
+				for chunk in _chunk_text(full_text):
+					pending.append((chunk, {"source": "notion", "page_id": pid}))
+
+			# Ingest GitHub files if provided
+			for path, content in zip(github_paths, contents):
+				if content is None:
+					continue
+				for chunk in _chunk_text(content):
+					pending.append((chunk, {"source": "github", "owner": github_owner, "repo": github_repo, "path": path}))
+
+		pending = [(chunk, meta) for chunk, meta in pending if len(chunk.strip()) >= MIN_CHUNK_CHARS]
+		added = removed = 0
+		try:
+			# Single add: build_embeddings splits into batches and submits them concurrently.
+			# Chunks already in the index (e.g. persisted before a restart) are skipped.
+			added = self.vector_store.add(pending, api_key=self.openai_api_key)
+			# Only after the new chunks are stored, drop chunks of edited pages/files that are gone,
+			# so a failed embed never leaves a source missing from the index
+			removed = self.vector_store.prune(pending)
+		finally:
+			if added or removed:
+				# Cached answers were produced from the old index
+				self.answer_cache.clear()
+
+		return {"status": "ok", "chunks_indexed": added, "chunks_removed": removed}
 
 	def _call_agent_query(self, args: Dict[str, Any]) -> Dict[str, Any]:
-		from utils.vector_store import redact_pii, summarize_with_openai
+		from utils.vector_store import build_embeddings, embed_query, redact_pii, summarize_with_openai
 
 		query = str(args.get("query", "")).strip()
 		if not query:
 			return {"error": "query is required"}
-
-		results = self.vector_store.search(query_text=query, top_k=8)
+		# Sensitive prompts opt out of the query-embedding and answer caches entirely
+		use_cache = not args.get("no_cache", False)
+
+		if use_cache:
+			q_vec = embed_query(query, api_key=self.openai_api_key)
+			cached = self.answer_cache.get(q_vec)
+			if cached is not None:
+				return cached
+		else:
+			# Bypass the embedding LRU too, so the prompt is not kept as a cache key
+			q_vec = build_embeddings([query], api_key=self.openai_api_key)[0]
+
+		results = self.vector_store.search_vector(q_vec, top_k=8)
 		sources = [{"source": r.metadata, "score": float(r.score)} for r in results]
 
 		redacted_context = redact_pii("\n\n".join(r.text for r in results))
@@ -155,8 +192,12 @@ class MCPServer:
 			api_key=self.openai_api_key,
 			query=query,
 			context=redacted_context,
+			top_score=results[0].score if results else 0.0,
 		)
-		return {"answer": answer, "sources": sources, "confidence_score": confidence}
+		result = {"answer": answer, "sources": sources, "confidence_score": confidence}
+		if use_cache:
+			self.answer_cache.put(q_vec, result)
+		return result
 
 	def _handle_message(self, msg: Dict[str, Any]) -> Optional[Dict[str, Any]]:
 		method = msg.get("method")
@@ -1,4 +1,6 @@
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List, Optional
+import orjson
 import requests
 
 
@@ -21,13 +23,18 @@ class NotionMCPClient:
 		return data.get("results", [])
 
 	def fetch_page(self, page_id: str) -> Dict[str, Any]:
+		# Page properties and block children are independent requests, so overlap them
+		with ThreadPoolExecutor(max_workers=1) as executor:
+			page_future = executor.submit(self._fetch_page_object, page_id)
+			blocks = self._fetch_blocks(page_id)
+			page = page_future.result()
+		return {"page": page, "blocks": blocks}
+
+	def _fetch_page_object(self, page_id: str) -> Dict[str, Any]:
 		url = f"{self.base}/pages/{page_id}"
 		resp = self.session.get(url, headers=self.headers)
 		resp.raise_for_status()
-		page = resp.json()
-		# Fetch blocks for content
-		blocks = self._fetch_blocks(page_id)
-		return {"page": page, "blocks": blocks}
+		return resp.json()
 
 	def _fetch_blocks(self, block_id: str) -> List[Dict[str, Any]]:
 		url = f"{self.base}/blocks/{block_id}/children"
@@ -39,7 +46,8 @@ class NotionMCPClient:
 				params["start_cursor"] = next_cursor
 			resp = self.session.get(url, headers=self.headers, params=params)
 			resp.raise_for_status()
-			data = resp.json()
+			# Block pages can be large; orjson parses the raw bytes without a decode step
+			data = orjson.loads(resp.content)
 			items.extend(data.get("results", []))
 			next_cursor = data.get("next_cursor")
 			if not data.get("has_more"):
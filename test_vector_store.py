@@ -0,0 +1,100 @@
+"""
+Regression tests for the persisted vector store
+Embeddings are faked so no OpenAI key is needed
+"""
+import hashlib
+
+import numpy as np
+import pytest
+
+import utils.vector_store as vector_store
+from utils.vector_store import EMBEDDING_DIM, VectorStore
+
+
+def fake_embedding(text: str) -> np.ndarray:
+    """Deterministic per-text vector, so any row can be checked against its text"""
+    seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+    return np.random.default_rng(seed).standard_normal(EMBEDDING_DIM).astype(np.float32)
+
+
+@pytest.fixture(autouse=True)
+def fake_embeddings(monkeypatch):
+    monkeypatch.setattr(vector_store, "build_embeddings", lambda texts, api_key=None: [fake_embedding(t) for t in texts])
+
+
+def page_items(page: int, version: str = "v1"):
+    return [(f"page {page} chunk {i} {version}", {"source": "notion", "page_id": f"p{page}"}) for i in range(10)]
+
+
+def assert_rows_match_texts(store: VectorStore) -> None:
+    assert len(store) == store._size
+    for i, text in enumerate(store._texts):
+        expected = fake_embedding(text)
+        expected /= np.linalg.norm(expected)
+        assert float(np.asarray(store._matrix[i], dtype=np.float32) @ expected) > 0.99, text
+
+
+def test_prune_crash_before_commit_keeps_persisted_rows_aligned(tmp_path, monkeypatch):
+    store = VectorStore(persist_dir=str(tmp_path))
+    for page in range(5):
+        store.add(page_items(page))
+    before = list(store._texts)
+
+    def crash(*args, **kwargs):
+        raise OSError("simulated crash before the header swap")
+
+    monkeypatch.setattr(store, "_write_header", crash)
+    edited = page_items(2, version="v2")
+    store.add(edited)
+    with pytest.raises(OSError):
+        store.prune(edited)
+
+    reloaded = VectorStore(persist_dir=str(tmp_path))
+    assert reloaded._texts == before + [t for t, _ in edited]
+    assert_rows_match_texts(reloaded)
+
+
+def test_prune_persists_compacted_rows(tmp_path):
+    store = VectorStore(persist_dir=str(tmp_path))
+    for page in range(5):
+        store.add(page_items(page))
+    edited = page_items(2, version="v2")
+    store.add(edited)
+    assert store.prune(edited) == 10
+    assert_rows_match_texts(store)
+
+    reloaded = VectorStore(persist_dir=str(tmp_path))
+    assert reloaded._texts == store._texts
+    assert not any("page 2" in t and "v1" in t for t in reloaded._texts)
+    assert_rows_match_texts(reloaded)
+    assert reloaded.add([("appended after compaction", {"source": "github", "path": "README.md"})]) == 1
+
+    again = VectorStore(persist_dir=str(tmp_path))
+    assert again._texts[-1] == "appended after compaction"
+    assert_rows_match_texts(again)
+
+
+@pytest.mark.skipif(vector_store.hnswlib is None, reason="hnswlib is optional")
+def test_prune_keeps_ann_index_and_maps_labels_to_rows(monkeypatch):
+    monkeypatch.setattr(vector_store, "ANN_MIN_ITEMS", 20)
+    store = VectorStore()
+    for page in range(3):
+        store.add(page_items(page))
+    ann = store._ann
+    assert ann is not None
+
+    edited = page_items(1, version="v2")
+    store.add(edited)
+    assert store.prune(edited) == 10
+    store.add(page_items(3))
+    assert store._ann is ann
+
+    for text in store._texts:
+        hit = store.search_vector(fake_embedding(text), top_k=1)[0]
+        assert hit.text == text and hit.score > 0.99
+    stale = "page 1 chunk 4 v1"
+    assert all(r.text != stale for r in store.search_vector(fake_embedding(stale), top_k=5))
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
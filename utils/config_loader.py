@@ -4,6 +4,7 @@ from dotenv import load_dotenv
 
 
 REQUIRED_VARS = ["OPENAI_API_KEY", "NOTION_TOKEN", "GITHUB_TOKEN"]
+OPTIONAL_VARS = ["VECTOR_STORE_DIR"]
 
 
 def load_config() -> Dict[str, str]:
@@ -14,4 +15,8 @@ def load_config() -> Dict[str, str]:
 		if not value:
 			raise RuntimeError(f"Missing required environment variable: {key}")
 		config[key] = value
+	for key in OPTIONAL_VARS:
+		value = os.getenv(key)
+		if value:
+			config[key] = value
 	return config
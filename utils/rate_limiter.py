@@ -1,3 +1,4 @@
+import threading
 import time
 from typing import Callable, Optional
 import requests
@@ -16,18 +17,34 @@ def _backoff_retry(func: Callable, retries: int = 5, base_delay: float = 0.5, ma
 	return wrapper
 
 
+class TokenBucket:
+	def __init__(self, per_second: float = 4.0, capacity: float = 8.0) -> None:
+		self._rate = max(per_second, 0.1)
+		self._capacity = max(capacity, 1.0)
+		self._tokens = self._capacity
+		self._last_refill = time.monotonic()
+		self._lock = threading.Lock()
+
+	def acquire(self) -> None:
+		with self._lock:
+			now = time.monotonic()
+			self._tokens = min(self._capacity, self._tokens + (now - self._last_refill) * self._rate)
+			self._last_refill = now
+			# Reserve the token now (possibly going negative) and sleep outside the lock,
+			# so concurrent callers queue up at the refill rate instead of on the lock
+			self._tokens -= 1.0
+			wait = -self._tokens / self._rate if self._tokens < 0 else 0.0
+		if wait > 0:
+			time.sleep(wait)
+
+
 class RateLimitedSession(requests.Session):
-	def __init__(self, per_second: float = 4.0) -> None:
+	def __init__(self, per_second: float = 4.0, burst: float = 8.0) -> None:
 		super().__init__()
-		self._min_interval = 1.0 / max(per_second, 0.1)
-		self._last_time: float = 0.0
+		self._bucket = TokenBucket(per_second, burst)
 
 	def request(self, *args, **kwargs):
-		now = time.time()
-		elapsed = now - self._last_time
-		if elapsed < self._min_interval:
-			time.sleep(self._min_interval - elapsed)
-		self._last_time = time.time()
+		self._bucket.acquire()
 		resp = super().request(*args, **kwargs)
 		return resp
 
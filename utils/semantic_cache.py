@@ -0,0 +1,60 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import threading
+import time
+import numpy as np
+
+from utils.vector_store import EMBEDDING_DIM, inner_product_search, normalize_vector
+
+
+class SemanticCache:
+	def __init__(self, max_size: int = 1024, threshold: float = 0.95, ttl_seconds: float = 3600.0, dim: int = EMBEDDING_DIM) -> None:
+		self._threshold = threshold
+		self._ttl = ttl_seconds
+		# One unit-length query embedding per slot; _live masks out empty slots
+		self._matrix = np.zeros((max_size, dim), dtype=np.float32)
+		self._live = np.zeros(max_size, dtype=bool)
+		self._free: List[int] = list(range(max_size - 1, -1, -1))
+		# slot -> (inserted_at, value), least recently used first
+		self._entries: "OrderedDict[int, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+		self._lock = threading.Lock()
+
+	def __len__(self) -> int:
+		return len(self._entries)
+
+	def get(self, q_vec: np.ndarray) -> Optional[Dict[str, Any]]:
+		with self._lock:
+			if not self._entries:
+				return None
+			scores = inner_product_search(self._matrix, q_vec)
+			scores[~self._live] = -np.inf
+			slot = int(np.argmax(scores))
+			if scores[slot] < self._threshold:
+				return None
+			inserted_at, value = self._entries[slot]
+			if time.monotonic() - inserted_at > self._ttl:
+				self._evict(slot)
+				return None
+			self._entries.move_to_end(slot)
+			return value
+
+	def put(self, q_vec: np.ndarray, value: Dict[str, Any]) -> None:
+		q_norm = normalize_vector(q_vec)
+		with self._lock:
+			if not self._free:
+				self._evict(next(iter(self._entries)))
+			slot = self._free.pop()
+			self._matrix[slot] = q_norm
+			self._live[slot] = True
+			self._entries[slot] = (time.monotonic(), value)
+
+	def clear(self) -> None:
+		with self._lock:
+			self._entries.clear()
+			self._live[:] = False
+			self._free = list(range(len(self._live) - 1, -1, -1))
+
+	def _evict(self, slot: int) -> None:
+		del self._entries[slot]
+		self._live[slot] = False
+		self._free.append(slot)
@@ -1,10 +1,42 @@
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Set, Tuple
+import functools
+import hashlib
+import json
+import os
+import random
+import threading
+import time
 import numpy as np
-from openai import OpenAI
+from openai import OpenAI, RateLimitError
 import re
 
+try:
+	import hnswlib
+except ImportError:  # optional: exact search is used when it is not installed
+	hnswlib = None
+
+
+EMBEDDING_DIM = 1536
+# Below this many vectors an exact scan is fast enough and has perfect recall
+ANN_MIN_ITEMS = 10_000
+# Rows widened to float32 per step when scoring a half-precision matrix; small enough to stay in cache
+SCORE_BLOCK_ROWS = 512
+INITIAL_CAPACITY = 1024
+EMBED_BATCH_SIZE = 96
+EMBED_MAX_WORKERS = 5
+
+_GENERATION_FILE_RE = re.compile(r"vectors(\.\d+)?\.bin|items(\.\d+)?\.jsonl")
+
+# One alternation so redaction is a single pass; the group name becomes the replacement tag
+_PII_RE = re.compile(
+	r"(?P<EMAIL>[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,})"
+	r"|(?P<SSN>\b\d{3}[-.]?\d{2}[-.]?\d{4}\b)"
+	r"|(?P<PHONE>(?:\+\d{1,3}[- ]?|\b)\d{3}[- ]?\d{3}[- ]?\d{4}\b)"
+)
+
 
 @dataclass
 class VectorItem:
@@ -15,55 +47,386 @@ class VectorItem:
 
 
 class VectorStore:
-	def __init__(self) -> None:
-		self._items: List[VectorItem] = []
+	def __init__(self, dtype: Any = np.float16, persist_dir: Optional[str] = None) -> None:
 		self._embedding_model = "text-embedding-3-small"
+		self._persist_dir = persist_dir
+		# Row i holds the unit-length vector for _texts[i] / _meta[i], so inner product == cosine.
+		# float16 halves memory and the bytes streamed per search; unit vectors lose ~1e-3 precision.
+		# Only the first _size rows are live; capacity doubles on overflow so appends are amortized O(1)
+		self._matrix = np.empty((INITIAL_CAPACITY, EMBEDDING_DIM), dtype=np.dtype(dtype))
+		self._size = 0
+		# Persisted files belong to a generation named by header.json; compaction writes the next one
+		self._generation = 0
+		self._texts: List[str] = []
+		self._meta: List[Dict[str, Any]] = []
+		# Content keys of stored (text, metadata) pairs, so re-ingesting the same chunk is free
+		self._keys: Set[bytes] = set()
+		self._ann: Optional[Any] = None
+		# hnswlib labels stay fixed while rows are compacted: row -> label and label -> row
+		self._ann_labels: List[int] = []
+		self._ann_rows: Dict[int, int] = {}
+		self._next_label = 0
+		if persist_dir:
+			self._load(np.dtype(dtype))
 
-	def add(self, items: List[Tuple[str, Dict[str, Any]]], api_key: Optional[str] = None) -> None:
-		if not items:
-			return
-		texts = [t for t, _ in items]
-		vectors = build_embeddings(texts, api_key=api_key)
-		for (text, metadata), vec in zip(items, vectors):
-			self._items.append(VectorItem(text=text, vector=vec, metadata=metadata))
+	def __len__(self) -> int:
+		return len(self._texts)
+
+	def add(self, items: List[Tuple[str, Dict[str, Any]]], api_key: Optional[str] = None) -> int:
+		fresh: List[Tuple[str, Dict[str, Any]]] = []
+		# Merged into self._keys only once the rows are stored, so a failed embed can be retried
+		fresh_keys: Set[bytes] = set()
+		for text, metadata in items:
+			key = _content_key(text, metadata)
+			if key not in self._keys and key not in fresh_keys:
+				fresh_keys.add(key)
+				fresh.append((text, metadata))
+		if not fresh:
+			return 0
+		texts = [t for t, _ in fresh]
+		# Shared boilerplate (license headers, templates) appears under many sources; embed it once
+		first_row: Dict[bytes, int] = {}
+		unique_texts: List[str] = []
+		rows: List[int] = []
+		for text in texts:
+			key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+			row = first_row.get(key)
+			if row is None:
+				row = first_row[key] = len(unique_texts)
+				unique_texts.append(text)
+			rows.append(row)
+		vectors = build_embeddings(unique_texts, api_key=api_key)
+		unique = np.vstack(vectors).astype(np.float32, copy=False)
+		unique /= np.linalg.norm(unique, axis=1, keepdims=True) + 1e-8
+		new = unique if len(unique_texts) == len(texts) else unique[rows]
+		start = self._size
+		self._reserve(start + len(new))
+		self._matrix[start:start + len(new)] = new
+		self._size = start + len(new)
+		self._texts.extend(texts)
+		self._meta.extend(metadata for _, metadata in fresh)
+		self._keys |= fresh_keys
+		if self._persist_dir:
+			self._persist(fresh)
+		self._update_ann(new, start)
+		return len(fresh)
+
+	def prune(self, items: List[Tuple[str, Dict[str, Any]]]) -> int:
+		# All chunks of one source (a Notion page, a GitHub file) share the same metadata, so
+		# stored rows of a re-ingested source whose text is no longer in `items` are stale
+		current = {_content_key(t, m) for t, m in items}
+		sources = {_source_key(m) for _, m in items}
+		stale = {
+			i for i, (t, m) in enumerate(zip(self._texts, self._meta))
+			if _source_key(m) in sources and _content_key(t, m) not in current
+		}
+		if not stale:
+			return 0
+		keep = [i for i in range(self._size) if i not in stale]
+		texts = [self._texts[i] for i in keep]
+		meta = [self._meta[i] for i in keep]
+		if self._persist_dir:
+			# The live files are never touched: if this raises, the store is unchanged on disk and in memory
+			self._matrix = self._write_generation(self._matrix[keep], texts, meta)
+		else:
+			self._matrix[:len(keep)] = self._matrix[keep]
+		self._texts = texts
+		self._meta = meta
+		self._size = len(keep)
+		self._keys = {_content_key(t, m) for t, m in zip(self._texts, self._meta)}
+		if self._ann is not None:
+			# Tombstone the stale labels instead of rebuilding the graph; only the row mapping moves
+			for i in stale:
+				self._ann.mark_deleted(self._ann_labels[i])
+			self._ann_labels = [self._ann_labels[i] for i in keep]
+			self._ann_rows = {label: row for row, label in enumerate(self._ann_labels)}
+		return len(stale)
+
+	def _load(self, dtype: np.dtype) -> None:
+		os.makedirs(self._persist_dir, exist_ok=True)
+		header_path = os.path.join(self._persist_dir, "header.json")
+		if os.path.exists(header_path):
+			with open(header_path, "r", encoding="utf-8") as f:
+				header = json.load(f)
+			dtype = np.dtype(header["dtype"])
+			self._generation = int(header.get("generation", 0))
+		else:
+			self._write_header(dtype, 0)
+		self._remove_other_generations()
+		vectors_path, items_path = self._generation_paths(self._generation)
+		# Byte offset just past each complete record, so the sidecar can be cut back to any row
+		record_ends: List[int] = []
+		if os.path.exists(items_path):
+			with open(items_path, "rb") as f:
+				offset = 0
+				for line in f:
+					try:
+						if not line.endswith(b"\n"):
+							raise ValueError("partial record")
+						record = json.loads(line)
+					except ValueError:
+						# Only the last record can be torn by a crash mid-append; anything else is real corruption
+						if f.read(1):
+							raise
+						break
+					offset += len(line)
+					record_ends.append(offset)
+					self._texts.append(record["text"])
+					self._meta.append(record["metadata"])
+		row_bytes = EMBEDDING_DIM * dtype.itemsize
+		on_disk = os.path.getsize(vectors_path) // row_bytes if os.path.exists(vectors_path) else 0
+		# Vectors are flushed before their sidecar lines, so the sidecar never runs ahead of them
+		self._size = min(len(self._texts), on_disk)
+		del self._texts[self._size:]
+		del self._meta[self._size:]
+		if os.path.exists(items_path):
+			# Drop a torn tail (and any records without vectors) so later appends stay row-aligned
+			good_end = record_ends[self._size - 1] if self._size else 0
+			if os.path.getsize(items_path) > good_end:
+				with open(items_path, "r+b") as f:
+					f.truncate(good_end)
+		self._keys = {_content_key(t, m) for t, m in zip(self._texts, self._meta)}
+		self._matrix = _open_memmap(vectors_path, dtype, max(on_disk, INITIAL_CAPACITY))
+		if self._size:
+			self._update_ann(self._matrix[:self._size], 0)
+
+	def _persist(self, fresh: List[Tuple[str, Dict[str, Any]]]) -> None:
+		# Flush once per add batch, then record the rows in the sidecar
+		self._matrix.flush()
+		with open(self._generation_paths(self._generation)[1], "a", encoding="utf-8") as f:
+			for text, metadata in fresh:
+				f.write(json.dumps({"text": text, "metadata": metadata}) + "\n")
+
+	def _write_generation(self, rows: np.ndarray, texts: List[str], meta: List[Dict[str, Any]]) -> np.ndarray:
+		generation = self._generation + 1
+		vectors_path, items_path = self._generation_paths(generation)
+		dtype = self._matrix.dtype
+		matrix = _open_memmap(vectors_path, dtype, len(self._matrix))
+		matrix[:len(rows)] = rows
+		matrix.flush()
+		with open(items_path, "w", encoding="utf-8") as f:
+			for text, metadata in zip(texts, meta):
+				f.write(json.dumps({"text": text, "metadata": metadata}) + "\n")
+			f.flush()
+			os.fsync(f.fileno())
+		# Commit point: both files are durable, so one atomic header swap switches to them
+		self._write_header(dtype, generation)
+		self._generation = generation
+		_close_memmap(self._matrix)
+		self._remove_other_generations()
+		return matrix
+
+	def _write_header(self, dtype: np.dtype, generation: int) -> None:
+		header_path = os.path.join(self._persist_dir, "header.json")
+		with open(header_path + ".tmp", "w", encoding="utf-8") as f:
+			json.dump({"dtype": dtype.name, "dim": EMBEDDING_DIM, "generation": generation}, f)
+			f.flush()
+			os.fsync(f.fileno())
+		os.replace(header_path + ".tmp", header_path)
+
+	def _generation_paths(self, generation: int) -> Tuple[str, str]:
+		suffix = f".{generation}" if generation else ""
+		return (
+			os.path.join(self._persist_dir, f"vectors{suffix}.bin"),
+			os.path.join(self._persist_dir, f"items{suffix}.jsonl"),
+		)
+
+	def _remove_other_generations(self) -> None:
+		# Files of a superseded generation, or of a compaction that crashed before its header swap
+		live = set(self._generation_paths(self._generation))
+		for name in os.listdir(self._persist_dir):
+			path = os.path.join(self._persist_dir, name)
+			if _GENERATION_FILE_RE.fullmatch(name) and path not in live:
+				os.remove(path)
 
 	def search(self, query_text: str, top_k: int = 8, api_key: Optional[str] = None) -> List[VectorItem]:
-		if not self._items:
+		if not self._texts or top_k <= 0:
+			return []
+		q_vec = embed_query(query_text, api_key=api_key)
+		return self.search_vector(q_vec, top_k=top_k)
+
+	def search_vector(self, q_vec: np.ndarray, top_k: int = 8) -> List[VectorItem]:
+		if not self._texts or top_k <= 0:
 			return []
-		q_vec = build_embeddings([query_text], api_key=api_key)[0]
-		matrix = np.vstack([it.vector for it in self._items])
-		scores = cosine_similarity(matrix, q_vec)
-		for it, sc in zip(self._items, scores):
-			it.score = float(sc)
-		return sorted(self._items, key=lambda x: x.score, reverse=True)[:top_k]
+		if self._ann is not None:
+			return self._search_ann(normalize_vector(q_vec), top_k)
+		scores = inner_product_search(self._matrix[:self._size], q_vec)
+		top_idx = top_k_indices(scores, top_k)
+		return [self._item(int(i), float(scores[i])) for i in top_idx]
+
+	def _reserve(self, needed: int) -> None:
+		capacity = len(self._matrix)
+		if needed <= capacity:
+			return
+		new_capacity = max(capacity * 2, needed)
+		if self._persist_dir:
+			# Rows already live in the file; extending it keeps them in place. Windows cannot
+			# resize a file that is still mapped, so the old mapping is closed first.
+			dtype = self._matrix.dtype
+			_close_memmap(self._matrix)
+			self._matrix = _open_memmap(self._generation_paths(self._generation)[0], dtype, new_capacity)
+			return
+		grown = np.empty((new_capacity, EMBEDDING_DIM), dtype=self._matrix.dtype)
+		grown[:self._size] = self._matrix[:self._size]
+		self._matrix = grown
+
+	def _item(self, idx: int, score: float) -> VectorItem:
+		# A copy, not a view: a view would pin the memmap and block growing the file
+		return VectorItem(text=self._texts[idx], vector=np.array(self._matrix[idx]), metadata=self._meta[idx], score=score)
+
+	def _update_ann(self, new: np.ndarray, start: int) -> None:
+		if hnswlib is None:
+			return
+		total = self._size
+		if self._ann is None:
+			if total < ANN_MIN_ITEMS:
+				return
+			# Vectors are unit length, so the inner-product space is cosine distance
+			self._ann = hnswlib.Index(space="ip", dim=EMBEDDING_DIM)
+			self._ann.init_index(max_elements=max(100_000, total * 2), ef_construction=200, M=16)
+			self._ann.add_items(self._matrix[:total].astype(np.float32), np.arange(total))
+			self._ann_labels = list(range(total))
+			self._ann_rows = {label: label for label in self._ann_labels}
+			self._next_label = total
+			return
+		labels = list(range(self._next_label, self._next_label + len(new)))
+		self._next_label += len(new)
+		# Deleted labels keep their slots, so capacity is sized by labels issued, not live rows
+		if self._next_label > self._ann.get_max_elements():
+			self._ann.resize_index(self._next_label * 2)
+		self._ann.add_items(new, labels)
+		self._ann_labels.extend(labels)
+		self._ann_rows.update((label, start + i) for i, label in enumerate(labels))
+
+	def _search_ann(self, q_norm: np.ndarray, top_k: int) -> List[VectorItem]:
+		k = min(top_k, len(self._texts))
+		self._ann.set_ef(max(64, k))
+		labels, distances = self._ann.knn_query(q_norm, k=k)
+		return [self._item(self._ann_rows[int(label)], float(1.0 - dist)) for label, dist in zip(labels[0], distances[0])]
 
 
-def cosine_similarity(matrix: np.ndarray, vector: np.ndarray) -> np.ndarray:
-	matrix_norm = matrix / (np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-8)
-	vector_norm = vector / (np.linalg.norm(vector) + 1e-8)
-	return matrix_norm @ vector_norm
+def _source_key(metadata: Dict[str, Any]) -> str:
+	return json.dumps(metadata, sort_keys=True)
+
+
+def _content_key(text: str, metadata: Dict[str, Any]) -> bytes:
+	payload = text + "\0" + _source_key(metadata)
+	return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).digest()
+
+
+def _open_memmap(path: str, dtype: np.dtype, rows: int) -> np.ndarray:
+	size = rows * EMBEDDING_DIM * dtype.itemsize
+	if not os.path.exists(path) or os.path.getsize(path) < size:
+		with open(path, "ab") as f:
+			f.truncate(size)
+	return np.memmap(path, dtype=dtype, mode="r+", shape=(rows, EMBEDDING_DIM))
+
+
+def _close_memmap(matrix: np.ndarray) -> None:
+	matrix.flush()
+	mm = getattr(matrix, "_mmap", None)
+	if mm is not None:
+		mm.close()
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+	k = min(k, len(scores))
+	if k <= 0:
+		return np.empty(0, dtype=np.intp)
+	# O(N) partial sort, then order only the k winners
+	neg = -scores
+	top_idx = np.argpartition(neg, k - 1)[:k]
+	return top_idx[np.argsort(neg[top_idx])]
+
+
+def normalize_vector(vector: np.ndarray) -> np.ndarray:
+	vector = np.asarray(vector, dtype=np.float32)
+	return vector / (np.linalg.norm(vector) + 1e-8)
+
+
+def inner_product_search(matrix: np.ndarray, vector: np.ndarray) -> np.ndarray:
+	# Rows of `matrix` are normalized once at add time; only the query is normalized here
+	q_norm = normalize_vector(vector)
+	if matrix.dtype == np.float32:
+		return matrix @ q_norm
+	# numpy has no half-precision BLAS kernel, so widen one cache-sized block at a time into a
+	# single reused scratch buffer and write each GEMV straight into its slice of `scores`
+	scores = np.empty(len(matrix), dtype=np.float32)
+	scratch = np.empty((min(SCORE_BLOCK_ROWS, len(matrix)), matrix.shape[1]), dtype=np.float32)
+	for i in range(0, len(matrix), SCORE_BLOCK_ROWS):
+		block = matrix[i:i + SCORE_BLOCK_ROWS]
+		widened = scratch[:len(block)]
+		np.copyto(widened, block)
+		np.dot(widened, q_norm, out=scores[i:i + len(block)])
+	return scores
+
+
+# One client per API key: each OpenAI() sets up its own HTTP connection pool
+_CLIENTS: Dict[Optional[str], OpenAI] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def _get_client(api_key: Optional[str] = None) -> OpenAI:
+	with _CLIENTS_LOCK:
+		client = _CLIENTS.get(api_key)
+		if client is None:
+			client = OpenAI(api_key=api_key) if api_key else OpenAI()
+			_CLIENTS[api_key] = client
+		return client
 
 
 def build_embeddings(texts: List[str], api_key: Optional[str] = None) -> List[np.ndarray]:
-	client = OpenAI(api_key=api_key) if api_key else OpenAI()
-	resp = client.embeddings.create(model="text-embedding-3-small", input=texts)
-	return [np.array(e.embedding, dtype=np.float32) for e in resp.data]
+	if not texts:
+		return []
+	client = _get_client(api_key)
+	batches = [texts[i:i + EMBED_BATCH_SIZE] for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+	if len(batches) == 1:
+		return _embed_batch(client, batches[0], jitter=False)
+	results: List[np.ndarray] = [None] * len(texts)  # type: ignore[list-item]
+	workers = min(EMBED_MAX_WORKERS, len(batches))
+	with ThreadPoolExecutor(max_workers=workers) as executor:
+		for batch_id, vectors in enumerate(executor.map(lambda b: _embed_batch(client, b), batches)):
+			offset = batch_id * EMBED_BATCH_SIZE
+			for i, vec in enumerate(vectors):
+				results[offset + i] = vec
+	return results
+
+
+def embed_query(text: str, api_key: Optional[str] = None) -> np.ndarray:
+	# Only surrounding whitespace is folded: case is meaningful for acronyms and code identifiers
+	return np.frombuffer(_embed_one_cached(text.strip(), api_key), dtype=np.float32)
+
+
+@functools.lru_cache(maxsize=2048)
+def _embed_one_cached(text: str, api_key: Optional[str]) -> bytes:
+	# Cached as immutable bytes so callers cannot mutate a shared array
+	return build_embeddings([text], api_key=api_key)[0].tobytes()
+
+
+def _embed_batch(client: OpenAI, texts: List[str], jitter: bool = True, retries: int = 5, base_delay: float = 0.5, max_delay: float = 8.0) -> List[np.ndarray]:
+	# Stagger concurrent batches so they do not hit the rate limit in lockstep
+	if jitter:
+		time.sleep(random.uniform(0, 0.05))
+	delay = base_delay
+	for attempt in range(retries):
+		try:
+			resp = client.embeddings.create(model="text-embedding-3-small", input=texts)
+			break
+		except RateLimitError:
+			if attempt == retries - 1:
+				raise
+			time.sleep(delay)
+			delay = min(max_delay, delay * 2)
+	data = sorted(resp.data, key=lambda e: e.index)
+	return [np.array(e.embedding, dtype=np.float32) for e in data]
 
 
 def redact_pii(text: str) -> str:
-	patterns = [
-		(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\\.[A-Za-z]{2,}", "[REDACTED_EMAIL]"),
-		(r"\\b\\d{3}[-.]?\\d{2}[-.]?\\d{4}\\b", "[REDACTED_SSN]"),
-		(r"\\b(?:\\+\\d{1,3}[- ]?)?\\d{3}[- ]?\\d{3}[- ]?\\d{4}\\b", "[REDACTED_PHONE]"),
-	]
-	redacted = text
-	for pat, repl in patterns:
-		redacted = re.sub(pat, repl, redacted)
-	return redacted
+	return _PII_RE.sub(lambda m: f"[REDACTED_{m.lastgroup}]", text)
 
 
-def summarize_with_openai(api_key: str, query: str, context: str) -> Tuple[str, float]:
-	client = OpenAI(api_key=api_key)
+def summarize_with_openai(api_key: str, query: str, context: str, top_score: float = 0.0) -> Tuple[str, float]:
+	client = _get_client(api_key)
 	prompt = (
 		"You are a helpful analyst. Use the provided context to answer the user. "
 		"Cite sources concisely if possible. Return a short, direct answer."
@@ -74,5 +437,6 @@ def summarize_with_openai(api_key: str, query: str, context: str) -> Tuple[str,
 	]
 	resp = client.chat.completions.create(model="gpt-4o-mini", messages=messages)
 	answer = resp.choices[0].message.content or ""
-	confidence = float(resp.choices[0].confidence or 0.7) if hasattr(resp.choices[0], "confidence") else 0.7
+	# Chat completions carry no confidence; the best retrieval similarity says how well the context matched
+	confidence = min(1.0, max(0.0, float(top_score)))
 	return answer.strip(), confidence